@@ -117,6 +117,9 @@ export async function autoAnomalyMonitor() {
         rpm: m.rotational_speed,
         torque: m.torque,
         tool_wear: m.tool_wear,
+        // dipakai ML service untuk rolling window per mesin
+        machine_id: m.machine_id,
+        timestamp: new Date(m.created_at).toISOString(),
       };
 
       try {
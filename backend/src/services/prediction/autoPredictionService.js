@@ -1,5 +1,5 @@
 import { pool } from "../../db/db.js";
-import { runFailurePrediction, savePrediction, mapStatus } from "./predictionService.js";
+import { runFailurePredictionBatch, savePrediction } from "./predictionService.js";
 
 export async function autoPredictAllMachines() {
   try {
@@ -18,18 +18,22 @@ export async function autoPredictAllMachines() {
 
     if (!latestSensor.rowCount) return 0;
 
-    for (const m of latestSensor.rows) {
-      const payload = {
-        Type: "M",
-        air_temp: m.air_temperature,
-        process_temp: m.process_temperature,
-        rpm: m.rotational_speed,
-        torque: m.torque,
-        tool_wear: m.tool_wear,
-      };
-
-      const result = await runFailurePrediction(payload);
-      const status = mapStatus(result.predicted_failure, result.confidence);
+    const payloads = latestSensor.rows.map((m) => ({
+      Type: "M",
+      air_temp: m.air_temperature,
+      process_temp: m.process_temperature,
+      rpm: m.rotational_speed,
+      torque: m.torque,
+      tool_wear: m.tool_wear,
+    }));
+
+    // satu request ke ML service untuk seluruh mesin
+    const results = await runFailurePredictionBatch(payloads);
+
+    for (const [i, m] of latestSensor.rows.entries()) {
+      const result = results[i];
+      if (!result) continue;
+      const status = result.status;
 
       const saved = await savePrediction({
         machine_id: m.machine_id,
@@ -36,6 +36,41 @@ export async function runFailurePrediction(payload) {
   };
 }
 
+export async function runFailurePredictionBatch(payloads) {
+  const mlUrl = process.env.ML_API_BATCH_URL ?? "http://localhost:8001/predict/batch";
+
+  const res = await fetch(mlUrl, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payloads)
+  });
+
+  const data = await res.json();
+
+  if (!res.ok) {
+    console.error("[ML API ERROR RESPONSE]", data);
+    throw new Error("ML Request Error");
+  }
+
+  for (const e of data.errors ?? []) {
+    console.error("[ML API ROW ERROR]", e);
+  }
+
+  // hasil sejajar dengan payloads; baris yang gagal di ML service = null
+  return (data.results ?? []).map((r) => {
+    if (!r) return null;
+    const predictedFailure = r.predicted_failure ?? r.label ?? "Unknown";
+    const confidence = r.confidence ?? r.probability ?? 0;
+
+    return {
+      predicted_failure: predictedFailure,
+      confidence,
+      status: mapStatus(predictedFailure, confidence),
+      raw: r
+    };
+  });
+}
+
 export async function savePrediction({machine_id=null,predicted_failure,confidence,status,raw=null}) {
   const q = `
     INSERT INTO prediction_logs
@@ -110,6 +145,7 @@ export async function getFullStatusAllMachines(){
 
 export default {
   runFailurePrediction,
+  runFailurePredictionBatch,
   savePrediction,
   mapStatus,
   getLatestPrediction,
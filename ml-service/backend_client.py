@@ -0,0 +1,90 @@
+# ============================================================
+#  ASYNC CLIENT KE BACKEND NODE (sensor latest & trend)
+#  Satu httpx.AsyncClient bersama: connection pooling, timeout,
+#  batas concurrency, dan cache TTL pendek untuk /latest.
+# ============================================================
+
+import asyncio
+import time
+
+import httpx
+
+
+class BackendClient:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        max_concurrency: int = 20,
+        latest_ttl: float = 1.0,
+        max_cache_entries: int = 4096,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.latest_ttl = latest_ttl
+        self.max_cache_entries = max_cache_entries
+
+        self._client = None
+        self._semaphore = None
+        self._latest = {}       # machine_id -> (expires_at, future)
+
+    async def start(self):
+        if self._client is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._latest.clear()
+
+    async def get_json(self, path: str):
+        if self._client is None:
+            await self.start()
+
+        async with self._semaphore:
+            res = await self._client.get(path)
+        res.raise_for_status()
+        return res.json()
+
+    async def latest(self, machine_id: int) -> dict:
+        """
+        Sensor terakhir satu mesin. Request yang datang bersamaan / dalam
+        latest_ttl detik memakai satu fetch yang sama ke backend.
+        """
+        now = time.monotonic()
+        hit = self._latest.get(machine_id)
+        if hit is not None and hit[0] > now:
+            return await asyncio.shield(hit[1])
+
+        fut = asyncio.ensure_future(self.get_json(f"/api/machines/latest/{machine_id}"))
+        self._latest[machine_id] = (now + self.latest_ttl, fut)
+        self._prune(now)
+
+        try:
+            return await asyncio.shield(fut)
+        except Exception:
+            # jangan cache error
+            if self._latest.get(machine_id, (None, None))[1] is fut:
+                del self._latest[machine_id]
+            raise
+
+    async def trend(self, machine_id: int):
+        return await self.get_json(f"/api/machines/trend/{machine_id}")
+
+    def _prune(self, now: float):
+        if len(self._latest) <= self.max_cache_entries:
+            return
+        for key in [k for k, (exp, _) in self._latest.items() if exp <= now]:
+            del self._latest[key]
@@ -0,0 +1,329 @@
+# ============================================================
+#  BENCHMARK ML-SERVICE (hot paths)
+#  Single-row & batch: feature engineering, /predict, /anomaly,
+#  /assess, /predict/batch, /assess/batch, dan proxy */latest
+#  (backend Node diganti stub lokal). Hasil ditulis ke JSON.
+#
+#  Contoh:
+#    python bench.py                                  # fleet 5,100,1000,10000
+#    python bench.py --fleet-sizes 5,50 --quick
+#    python bench.py --output base.json
+#    python bench.py --output new.json --compare base.json
+# ============================================================
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ============================================================
+#  DATA SINTETIS (skema PredictRequest)
+# ============================================================
+
+def make_fleet(n: int, seed: int = 42) -> list:
+    rng = np.random.default_rng(seed)
+    types = rng.choice(["L", "M", "H"], size=n, p=[0.6, 0.3, 0.1])
+    air = rng.normal(300.0, 2.0, n)
+    proc = air + rng.normal(10.0, 1.0, n)
+    rpm = rng.normal(1540.0, 180.0, n).clip(1100, 2900)
+    torque = rng.normal(40.0, 10.0, n).clip(3, 77)
+    wear = rng.integers(0, 250, n)
+
+    return [
+        {
+            "machine_id": i + 1,
+            "Type": str(types[i]),
+            "air_temp": round(float(air[i]), 1),
+            "process_temp": round(float(proc[i]), 1),
+            "rpm": float(round(rpm[i])),
+            "torque": round(float(torque[i]), 1),
+            "tool_wear": float(wear[i]),
+        }
+        for i in range(n)
+    ]
+
+
+def _single(row: dict) -> dict:
+    return {k: v for k, v in row.items() if k != "machine_id"}
+
+
+# ============================================================
+#  STUB BACKEND (/api/machines/latest & /trend)
+# ============================================================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_backend(fleet: dict, port: int):
+    import uvicorn
+    from fastapi import FastAPI, HTTPException
+
+    stub = FastAPI()
+
+    @stub.get("/api/machines/latest/{machine_id}")
+    def latest(machine_id: int):
+        row = fleet.get(machine_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="not found")
+        return {**_single(row), "created_at": "2025-01-01T00:00:00Z"}
+
+    @stub.get("/api/machines/trend/{machine_id}")
+    def trend(machine_id: int):
+        return {"status": "success", "machine_id": machine_id, "points": 0, "trend": []}
+
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return server
+
+
+# ============================================================
+#  PENGUKURAN
+# ============================================================
+
+def summarize(name: str, fleet_size: int, rows_per_call: int, samples_ns: list) -> dict:
+    ms = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    total_s = ms.sum() / 1000
+    return {
+        "name": name,
+        "fleet_size": fleet_size,
+        "rows_per_call": rows_per_call,
+        "calls": len(ms),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "rows_per_s": float(rows_per_call * len(ms) / total_s) if total_s > 0 else None,
+    }
+
+
+def time_calls(fn, args_list: list, warmup: int = 3) -> list:
+    for args in args_list[:warmup]:
+        fn(*args)
+    samples = []
+    for args in args_list:
+        t = time.perf_counter_ns()
+        fn(*args)
+        samples.append(time.perf_counter_ns() - t)
+    return samples
+
+
+async def time_async_calls(fn, args_list: list, warmup: int = 3) -> list:
+    for args in args_list[:warmup]:
+        await fn(*args)
+    samples = []
+    for args in args_list:
+        t = time.perf_counter_ns()
+        await fn(*args)
+        samples.append(time.perf_counter_ns() - t)
+    return samples
+
+
+def bench_features(server, fleet: list, n_single: int, repeats: int) -> list:
+    from features import build_features, encode_types, rows_to_arrays
+
+    b = server.registry.get()
+    out = []
+
+    def features(rows):
+        types, values = rows_to_arrays(rows)
+        return build_features(encode_types(types, b.type_codes), values)
+
+    single = [([r],) for r in fleet[:n_single]]
+    out.append(summarize("features.single", len(fleet), 1, time_calls(features, single)))
+    out.append(summarize("features.batch", len(fleet), len(fleet), time_calls(features, [(fleet,)] * repeats)))
+    return out
+
+
+async def bench_http(server, fleet: list, n_single: int, repeats: int, concurrency: int) -> list:
+    import httpx
+
+    out = []
+    n = len(fleet)
+    singles = fleet[:n_single]
+
+    async with server.lifespan(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+            async def post(path, body):
+                res = await client.post(path, json=body)
+                res.raise_for_status()
+
+            async def get(path):
+                res = await client.get(path)
+                res.raise_for_status()
+
+            out.append(summarize("predict.single", n, 1, await time_async_calls(
+                post, [("/predict", _single(r)) for r in singles])))
+            out.append(summarize("anomaly.single", n, 1, await time_async_calls(
+                post, [("/anomaly", r) for r in singles])))
+            out.append(summarize("assess.single", n, 1, await time_async_calls(
+                post, [("/assess", r) for r in singles])))
+
+            batch = [_single(r) for r in fleet]
+            out.append(summarize("predict.batch", n, n, await time_async_calls(
+                post, [("/predict/batch", batch)] * repeats, warmup=1)))
+            out.append(summarize("assess.batch", n, n, await time_async_calls(
+                post, [("/assess/batch", fleet)] * repeats, warmup=1)))
+
+            # proxy */latest: cache latest dikosongkan supaya tiap request benar-benar ke backend
+            server.backend._latest.clear()
+            out.append(summarize("predict.latest", n, 1, await time_async_calls(
+                get, [(f"/predict/latest/{r['machine_id']}",) for r in singles], warmup=0)))
+            server.backend._latest.clear()
+            out.append(summarize("anomaly.latest", n, 1, await time_async_calls(
+                get, [(f"/anomaly/latest/{r['machine_id']}",) for r in singles], warmup=0)))
+
+            # burst: satu "tick" -> seluruh fleet minta /predict/latest bersamaan
+            server.backend._latest.clear()
+            sem = asyncio.Semaphore(concurrency)
+
+            async def limited(path):
+                async with sem:
+                    await get(path)
+
+            t = time.perf_counter_ns()
+            await asyncio.gather(*[limited(f"/predict/latest/{r['machine_id']}") for r in fleet])
+            out.append(summarize("predict.latest.burst", n, n, [time.perf_counter_ns() - t]))
+
+    return out
+
+
+# ============================================================
+#  OUTPUT & PERBANDINGAN
+# ============================================================
+
+def environment() -> dict:
+    import pandas
+    import sklearn
+    import xgboost
+
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+    }
+
+
+def compare(current: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["fleet_size"]): r for r in json.load(f)["results"]}
+
+    print(f"\n{'case':<24}{'fleet':>7}{'p50 base':>12}{'p50 now':>12}{'ratio':>8}")
+    for r in current:
+        base = baseline.get((r["name"], r["fleet_size"]))
+        if base is None:
+            continue
+        ratio = r["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("nan")
+        flag = "  <- slower" if ratio > 1.10 else ""
+        print(f"{r['name']:<24}{r['fleet_size']:>7}{base['p50_ms']:>12.3f}{r['p50_ms']:>12.3f}{ratio:>8.2f}{flag}")
+
+
+def print_table(results: list):
+    print(f"\n{'case':<24}{'fleet':>7}{'rows/call':>10}{'calls':>7}{'p50 ms':>10}{'p99 ms':>10}{'rows/s':>12}")
+    for r in results:
+        rps = f"{r['rows_per_s']:.0f}" if r["rows_per_s"] else "-"
+        print(f"{r['name']:<24}{r['fleet_size']:>7}{r['rows_per_call']:>10}{r['calls']:>7}"
+              f"{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{rps:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ML-service hot paths")
+    parser.add_argument("--fleet-sizes", default="5,100,1000,10000")
+    parser.add_argument("--single-requests", type=int, default=500, help="max single-row calls per case")
+    parser.add_argument("--repeats", type=int, default=10, help="calls per batch case")
+    parser.add_argument("--concurrency", type=int, default=64, help="in-flight requests for the latest burst")
+    parser.add_argument("--cache", action="store_true", help="keep the prediction cache enabled")
+    parser.add_argument("--quick", action="store_true", help="fewer calls (smoke run)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.single_requests, args.repeats = 50, 3
+
+    fleet_sizes = [int(x) for x in args.fleet_sizes.split(",")]
+    fleets = {n: make_fleet(n, args.seed) for n in fleet_sizes}
+    largest = fleets[max(fleet_sizes)]
+
+    args.output = os.path.abspath(args.output)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+
+    # env harus di-set sebelum server di-import
+    port = _free_port()
+    os.environ["BACKEND_URL"] = f"http://127.0.0.1:{port}"
+    if not args.cache:
+        os.environ["PREDICT_CACHE_SIZE"] = "0"
+    os.chdir(HERE)
+    sys.path.insert(0, HERE)
+
+    stub = start_stub_backend({r["machine_id"]: r for r in largest}, port)
+
+    t = time.perf_counter()
+    import server
+    server.registry.get()
+    load_s = time.perf_counter() - t
+
+    results = []
+    for n in fleet_sizes:
+        fleet = fleets[n]
+        n_single = min(n, args.single_requests)
+        print(f"fleet={n} ...", flush=True)
+
+        if server.rolling_store is not None:
+            server.rolling_store.clear()
+        results += bench_features(server, fleet, n_single, args.repeats)
+        results += asyncio.run(bench_http(server, fleet, n_single, args.repeats, args.concurrency))
+
+    stub.should_exit = True
+
+    report = {
+        "environment": environment(),
+        "config": {**vars(args), "fleet_sizes": fleet_sizes, "import_and_load_s": load_s},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_table(results)
+    print(f"\nwritten to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
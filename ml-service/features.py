@@ -0,0 +1,85 @@
+# ============================================================
+#  FEATURE ENGINEERING (vectorized NumPy)
+#  Dipakai bersama oleh model failure (XGBoost) dan anomaly
+#  (IsolationForest). Semua fungsi bekerja untuk N baris sekaligus.
+# ============================================================
+
+import numpy as np
+
+INPUT_COLUMNS = ["air_temp", "process_temp", "rpm", "torque", "tool_wear"]
+
+FEATURE_ORDER = [
+    "Type", "air_temp", "process_temp", "rpm", "torque", "tool_wear",
+    "temp_diff", "torque_rpm_ratio", "power", "temp_stress",
+    "wear_per_rpm", "torque_squared", "tool_wear_squared",
+    "torque_wear_interaction", "rpm_temp_interaction", "power_wear_ratio",
+]
+
+ANOMALY_FEATURES = [
+    "Type","air_temp","process_temp","rpm","torque","tool_wear",
+    "temp_diff","torque_rpm_ratio","power","temp_stress","wear_per_rpm",
+    "torque_squared","tool_wear_squared","torque_wear_interaction",
+    "rpm_temp_interaction","power_wear_ratio",
+    "air_temp_rolling_mean","air_temp_rolling_std",
+    "process_temp_rolling_mean","process_temp_rolling_std",
+    "rpm_rolling_mean","rpm_rolling_std",
+    "torque_rolling_mean","torque_rolling_std",
+    "tool_wear_rolling_mean","tool_wear_rolling_std"
+]
+
+# posisi kolom rolling di ANOMALY_FEATURES: mean di 16,18,..; std di 17,19,..
+ROLLING_OFFSET = len(FEATURE_ORDER)
+
+
+def make_type_codes(le) -> dict:
+    """Tabel Type -> kode, sama dengan le.transform (classes_ sudah terurut)."""
+    return {str(cls): code for code, cls in enumerate(le.classes_)}
+
+
+def encode_types(types, type_codes: dict) -> np.ndarray:
+    try:
+        return np.fromiter((type_codes[t] for t in types), dtype=np.float64, count=len(types))
+    except KeyError as e:
+        raise ValueError(f"Unknown Type '{e.args[0]}', allowed: {list(type_codes)}")
+
+
+def rows_to_arrays(rows: list):
+    """list of dict (bentuk PredictRequest) -> (types, values[N, 5])."""
+    types = [r["Type"] for r in rows]
+    values = np.array([[r[c] for c in INPUT_COLUMNS] for r in rows], dtype=np.float64)
+    return types, values.reshape(len(rows), len(INPUT_COLUMNS))
+
+
+def build_features(type_codes: np.ndarray, values: np.ndarray, width: int = len(FEATURE_ORDER)) -> np.ndarray:
+    """
+    Isi matrix [N, width] dengan urutan kolom FEATURE_ORDER.
+    Kolom setelah FEATURE_ORDER (rolling anomaly) dibiarkan untuk diisi caller.
+    Operasinya sama persis (urutan & konstanta) dengan versi pandas lama.
+    """
+    X = np.empty((values.shape[0], width), dtype=np.float64)
+    air, proc, rpm, torque, wear = values.T
+
+    X[:, 0] = type_codes
+    X[:, 1:6] = values
+
+    temp_diff = np.subtract(proc, air, out=X[:, 6])
+    np.divide(torque, rpm + 1e-5, out=X[:, 7])
+    power = np.divide(torque * rpm, 9.5488, out=X[:, 8])
+    np.divide(proc, air + 1e-5, out=X[:, 9])
+    np.divide(wear, rpm + 1e-5, out=X[:, 10])
+    np.square(torque, out=X[:, 11])
+    np.square(wear, out=X[:, 12])
+    np.multiply(torque, wear, out=X[:, 13])
+    np.multiply(rpm, temp_diff, out=X[:, 14])
+    np.divide(power, wear + 1e-5, out=X[:, 15])
+
+    return X
+
+
+def features_to_records(X: np.ndarray, columns: list) -> list:
+    records = []
+    for row in X.tolist():
+        rec = dict(zip(columns, row))
+        rec["Type"] = int(rec["Type"])
+        records.append(rec)
+    return records
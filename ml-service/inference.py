@@ -0,0 +1,119 @@
+# ============================================================
+#  INFERENSI MODEL (tanpa state, tanpa FastAPI)
+#  Dipakai oleh server.py, worker process (workers.py) dan CLI
+#  bulk scoring. Semua fungsi menerima ModelBundle + matrix fitur.
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_ORDER, ANOMALY_FEATURES
+from metrics import observe_batch, timed
+from registry import ModelBundle
+
+
+def get_status(pred_failure: str, anomaly_label: int = 0):
+    if pred_failure not in ["No Failure", "NO_FAILURE"]:
+        return "CRITICAL"
+    if anomaly_label == 1:
+        return "WARNING"
+    return "NORMAL"
+
+
+# ============================================================
+#  FAILURE (XGBoost)
+# ============================================================
+
+def _failure_label(b: ModelBundle, idx: int) -> str:
+    try:
+        return b.failure_le.inverse_transform([idx])[0]
+    except:
+        return str(idx)
+
+
+def failure_arrays(b: ModelBundle, X_input: np.ndarray):
+    """
+    Inferensi failure versi array untuk matrix [N, FEATURE_ORDER]:
+    (label[N], confidence[N] | None, probabilities[N, K] | None, nama kelas[K]).
+    """
+    observe_batch("failure", len(X_input))
+
+    with timed("scale", "failure"):
+        X_scaled = b.scaler.transform(pd.DataFrame(X_input, columns=FEATURE_ORDER, copy=False))
+
+    with timed("inference", "failure"):
+        probabilities = None
+        if hasattr(b.model, "predict_proba"):
+            probabilities = b.model.predict_proba(X_scaled)
+            pred_encoded = probabilities.argmax(axis=1)
+        else:
+            pred_encoded = np.asarray(b.model.predict(X_scaled)).astype(int)
+
+    with timed("decode", "failure"):
+        pred_failures = b.failure_le.inverse_transform(pred_encoded)
+        confidence = None
+        prob_labels = []
+        if probabilities is not None:
+            confidence = probabilities[np.arange(len(pred_encoded)), pred_encoded]
+            prob_labels = [_failure_label(b, i) for i in range(probabilities.shape[1])]
+
+    return pred_failures, confidence, probabilities, prob_labels
+
+
+def predict_matrix(b: ModelBundle, X_input: np.ndarray) -> list:
+    """Inferensi failure untuk matrix fitur [N, FEATURE_ORDER] (tanpa input_features)."""
+    pred_failures, confidence, probabilities, prob_labels = failure_arrays(b, X_input)
+
+    with timed("format", "failure"):
+        results = []
+        for i, pred_failure in enumerate(pred_failures):
+            prob_dict = {}
+            if probabilities is not None:
+                prob_dict = dict(zip(prob_labels, probabilities[i].tolist()))
+
+            results.append({
+                "predicted_failure": pred_failure,
+                "confidence": float(confidence[i]) if confidence is not None else None,
+                "probabilities": prob_dict or None,
+                "status": get_status(pred_failure),
+            })
+
+    return results
+
+
+# ============================================================
+#  ANOMALY (IsolationForest)
+# ============================================================
+
+def anomaly_arrays(b: ModelBundle, X: np.ndarray):
+    """Inferensi IsolationForest versi array: (is_anomaly[N] bool, score[N] | None)."""
+    observe_batch("anomaly", len(X))
+
+    with timed("scale", "anomaly"):
+        X_scaled = b.anomaly_scaler.transform(pd.DataFrame(X, columns=ANOMALY_FEATURES, copy=False))
+
+    with timed("inference", "anomaly"):
+        raw_pred = np.asarray(b.anomaly_model.predict(X_scaled))
+
+        scores = None
+        if hasattr(b.anomaly_model, "decision_function"):
+            scores = b.anomaly_model.decision_function(X_scaled)
+
+    return raw_pred == -1, scores
+
+
+def anomaly_matrix(b: ModelBundle, X: np.ndarray) -> list:
+    """Inferensi IsolationForest untuk matrix fitur [N, ANOMALY_FEATURES]."""
+    is_anomaly, scores = anomaly_arrays(b, X)
+
+    with timed("format", "anomaly"):
+        scores = scores.tolist() if scores is not None else None
+        results = []
+        for i, flag in enumerate(is_anomaly.tolist()):
+            results.append({
+                "is_anomaly": flag,
+                "score": scores[i] if scores is not None else None,
+                "status": "WARNING" if flag else "NORMAL",
+            })
+
+    return results
@@ -0,0 +1,315 @@
+# ============================================================
+#  METRICS (format teks Prometheus) + SAMPLING PROFILER
+#  Tanpa dependency tambahan; overhead per observasi hanya
+#  perf_counter + bisect + increment di bawah lock.
+# ============================================================
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Counts
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for values, v in items:
+            lines.append(f"{self.name}{_labels(self.label_names, values)} {_fmt(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        self._series = {}       # label_values -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value: float, *label_values):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(label_values)
+            if s is None:
+                s = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][idx] += 1
+            s[1] += value
+            s[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+
+        for values, counts, total, count in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, values)} {count}")
+        return lines
+
+
+def collector(fn):
+    """
+    Daftarkan fungsi yang dipanggil saat scrape. fn() mengembalikan list
+    (name, type, help, {'{label="x"}' atau "": value}) untuk gauge/counter
+    yang nilainya sudah disimpan di tempat lain (cache, rolling store).
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for m in _metrics:
+        lines.extend(m.render())
+
+    for fn in _collectors:
+        try:
+            families = fn()
+        except Exception:
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples.items():
+                lines.append(f"{name}{labels} {_fmt(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================
+#  METRIC YANG DIPAKAI SERVICE
+# ============================================================
+
+REQUESTS = Counter("ml_requests_total", "HTTP requests handled", ("method", "path", "status"))
+REQUEST_LATENCY = Histogram("ml_request_duration_seconds", "End-to-end HTTP request latency", ("method", "path"))
+STAGE_LATENCY = Histogram("ml_stage_duration_seconds", "Time spent per pipeline stage", ("stage", "model"))
+BATCH_ROWS = Histogram(
+    "ml_batch_rows", "Rows per model call", ("model",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+
+
+_capture = threading.local()
+
+
+class capture:
+    """
+    `with capture() as samples:` -> observasi timed()/observe_batch() di
+    thread ini ditampung ke list, bukan ke histogram. Dipakai worker
+    process: list dikirim balik ke proses utama lalu di-replay().
+    """
+
+    def __enter__(self):
+        self.samples = []
+        _capture.samples = self.samples
+        return self.samples
+
+    def __exit__(self, *exc):
+        _capture.samples = None
+        return False
+
+
+def replay(samples: list):
+    if not METRICS_ENABLED:
+        return
+    for kind, value, *labels in samples:
+        (STAGE_LATENCY if kind == "stage" else BATCH_ROWS).observe(value, *labels)
+
+
+class timed:
+    """`with timed("scale", "failure"):` -> observe ke ml_stage_duration_seconds."""
+
+    __slots__ = ("stage", "model", "start")
+
+    def __init__(self, stage: str, model: str):
+        self.stage = stage
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        samples = getattr(_capture, "samples", None)
+        if samples is not None:
+            samples.append(("stage", time.perf_counter() - self.start, self.stage, self.model))
+        elif METRICS_ENABLED:
+            STAGE_LATENCY.observe(time.perf_counter() - self.start, self.stage, self.model)
+        return False
+
+
+def observe_batch(model: str, n_rows: int):
+    samples = getattr(_capture, "samples", None)
+    if samples is not None:
+        samples.append(("batch", n_rows, model))
+    elif METRICS_ENABLED:
+        BATCH_ROWS.observe(n_rows, model)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: hitung request & latency per route template (bukan URL mentah)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUESTS.inc(method, path, str(status[0]))
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method, path)
+
+
+# ============================================================
+#  SAMPLING PROFILER (opt-in, dinyalakan saat runtime)
+#  Thread terpisah mengambil stack semua thread tiap `interval`
+#  detik; hasil dalam format "collapsed stacks" (flamegraph.pl /
+#  speedscope). Thread yang sedang idle (menunggu lock/queue/IO)
+#  tidak dihitung.
+# ============================================================
+
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "base_events.py", "thread.py")
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.interval = 0.005
+        self.started_at = None
+        self.stopped_at = None
+        self.samples = _Counts()
+        self.n_samples = 0
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.005, max_seconds: float = 60.0):
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = interval
+            self.samples = _Counts()
+            self.n_samples = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(max_seconds,), name="ml-sampling-profiler", daemon=True,
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=2)
+
+    def _run(self, max_seconds: float):
+        own = threading.get_ident()
+        deadline = time.monotonic() + max_seconds
+
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                break
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                self.samples[self._collapse(frame)] += 1
+                self.n_samples += 1
+
+        self.stopped_at = time.time()
+
+    @staticmethod
+    def _collapse(frame, max_depth: int = 64) -> str:
+        stack = []
+        while frame is not None and len(stack) < max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def report(self, limit: int = 50) -> dict:
+        top = self.samples.most_common(limit)
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "duration_s": (end - self.started_at) if self.started_at else 0.0,
+            "samples": self.n_samples,
+            "top": [{"stack": stack, "count": count} for stack, count in top],
+        }
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+profiler = SamplingProfiler()
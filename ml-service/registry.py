@@ -0,0 +1,144 @@
+# ============================================================
+#  MODEL REGISTRY
+#  - artifact di-load saat pertama dipakai, bukan saat import
+#  - array numpy di-memory-map (mmap_mode="r") -> page dipakai
+#    bersama oleh semua worker di node yang sama
+#  - versi baru di-load di samping versi lama lalu di-swap atomik;
+#    request yang sedang jalan tetap memakai bundle lamanya
+# ============================================================
+
+import itertools
+import logging
+import os
+import threading
+import time
+
+import joblib
+
+from features import make_type_codes
+
+logger = logging.getLogger("ml-service.registry")
+
+MODEL_FILE = "model.pkl"
+SCALER_FILE = "scaler.pkl"
+FAILURE_LE_FILE = "failure_le.pkl"
+TYPE_LE_FILE = "type_le.pkl"
+
+ANOMALY_DIR = "model_anomaly"
+ANOMALY_MODEL_FILE = "anomaly_isoforest.pkl"
+ANOMALY_SCALER_FILE = "anomaly_scaler.pkl"
+ANOMALY_TYPE_LE_FILE = "anomaly_type_le.pkl"
+ANOMALY_META_FILE = "model_metadata.pkl"
+
+# nomor urut bundle di proses ini; bundle yang di-load belakangan selalu lebih besar
+_generations = itertools.count(1)
+
+
+class ModelBundle:
+    """Satu set artifact (failure + anomaly) dari satu direktori versi."""
+
+    def __init__(self, model_dir: str, mmap_mode: str = "r"):
+        self.model_dir = os.path.abspath(model_dir)
+        self.version = os.path.basename(self.model_dir)
+        self.loaded_at = time.time()
+        self.generation = next(_generations)
+
+        def load(*parts):
+            return joblib.load(os.path.join(self.model_dir, *parts), mmap_mode=mmap_mode)
+
+        # model failure wajib ada -> error di sini menggagalkan load
+        self.model = load(MODEL_FILE)
+        self.scaler = load(SCALER_FILE)
+        self.failure_le = load(FAILURE_LE_FILE)
+        self.type_le = load(TYPE_LE_FILE)
+        self.type_codes = make_type_codes(self.type_le)
+
+        # model anomaly opsional, tapi error-nya dicatat (tidak ditelan diam-diam)
+        self.anomaly_model = None
+        self.anomaly_scaler = None
+        self.anomaly_type_le = None
+        self.anomaly_type_codes = {}
+        self.anomaly_meta = {}
+        self.anomaly_error = None
+
+        try:
+            anomaly_model = load(ANOMALY_DIR, ANOMALY_MODEL_FILE)
+            anomaly_scaler = load(ANOMALY_DIR, ANOMALY_SCALER_FILE)
+            anomaly_type_le = load(ANOMALY_DIR, ANOMALY_TYPE_LE_FILE)
+            anomaly_meta = load(ANOMALY_DIR, ANOMALY_META_FILE)
+        except Exception as e:
+            self.anomaly_error = f"{type(e).__name__}: {e}"
+            logger.warning("Anomaly model not loaded from %s: %s", self.model_dir, self.anomaly_error)
+        else:
+            self.anomaly_model = anomaly_model
+            self.anomaly_scaler = anomaly_scaler
+            self.anomaly_type_le = anomaly_type_le
+            self.anomaly_type_codes = make_type_codes(anomaly_type_le)
+            self.anomaly_meta = anomaly_meta
+
+    @property
+    def window_size(self) -> int:
+        return int(self.anomaly_meta.get("window_size", 50))
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "model_dir": self.model_dir,
+            "loaded_at": self.loaded_at,
+            "anomaly_loaded": self.anomaly_model is not None,
+            "anomaly_error": self.anomaly_error,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str, root: str = None, mmap_mode: str = "r"):
+        self.model_dir = model_dir
+        self.root = root or model_dir
+        self.mmap_mode = mmap_mode
+
+        self._bundle = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._bundle is not None
+
+    def get(self) -> ModelBundle:
+        """Bundle aktif (lazy load). Ambil sekali per request lalu teruskan."""
+        bundle = self._bundle
+        if bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    self._bundle = ModelBundle(self.model_dir, self.mmap_mode)
+                    logger.info("Loaded models from %s", self._bundle.model_dir)
+                bundle = self._bundle
+        return bundle
+
+    def resolve(self, version: str = None) -> str:
+        if not version:
+            return self.model_dir
+
+        if version in (".", "..") or version != os.path.basename(version):
+            raise ValueError(f"Invalid model version '{version}'")
+
+        path = os.path.join(self.root, version)
+        if not os.path.isdir(path):
+            raise ValueError(f"Model version '{version}' not found in {self.root}")
+        return path
+
+    def reload(self, version: str = None) -> ModelBundle:
+        """
+        Load versi `version` (sub-direktori dari root; kosong = direktori
+        aktif) lalu swap. Jika load gagal, bundle lama tetap dipakai.
+        """
+        path = self.resolve(version)
+
+        with self._reload_lock:
+            bundle = ModelBundle(path, self.mmap_mode)
+            with self._lock:
+                self._bundle = bundle
+                self.model_dir = path
+
+        logger.info("Reloaded models from %s", bundle.model_dir)
+        return bundle
@@ -0,0 +1,200 @@
+# ============================================================
+#  ROLLING WINDOW PER MESIN (untuk fitur *_rolling_mean / *_rolling_std)
+#  Ring buffer berukuran tetap + update Welford O(1) per reading.
+#  Mesin yang lama tidak mengirim data dibuang (idle TTL / LRU).
+# ============================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class _Window:
+    __slots__ = ("buf", "pos", "n", "mean", "m2", "since_resync", "last_seen", "last_key")
+
+    def __init__(self, size: int, n_cols: int):
+        self.buf = np.zeros((size, n_cols), dtype=np.float64)
+        self.pos = 0
+        self.n = 0
+        self.mean = np.zeros(n_cols, dtype=np.float64)
+        self.m2 = np.zeros(n_cols, dtype=np.float64)
+        self.since_resync = 0
+        self.last_seen = 0.0
+        self.last_key = None
+
+    def push(self, x: np.ndarray):
+        size = self.buf.shape[0]
+
+        if self.n < size:
+            self.n += 1
+            delta = x - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (x - self.mean)
+        else:
+            # geser window: buang nilai tertua, masukkan nilai baru
+            old = self.buf[self.pos].copy()
+            old_mean = self.mean.copy()
+            self.mean += (x - old) / size
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % size
+
+        # hitung ulang dari buffer tiap `size` update supaya error float tidak menumpuk
+        self.since_resync += 1
+        if self.since_resync >= size:
+            data = self.buf[:self.n]
+            self.mean = data.mean(axis=0)
+            self.m2 = ((data - self.mean) ** 2).sum(axis=0)
+            self.since_resync = 0
+
+    def history(self) -> np.ndarray:
+        """Isi window urut dari reading terlama."""
+        if self.n < self.buf.shape[0]:
+            return self.buf[:self.n]
+        return np.roll(self.buf, -self.pos, axis=0)
+
+    def push_block(self, values: np.ndarray):
+        """
+        Push N reading berurutan sekaligus; kembalikan (mean[N], std[N])
+        per reading. Sum kumulatif dari data yang sudah digeser ke rata-
+        ratanya (bukan loop Welford per baris).
+        """
+        size = self.buf.shape[0]
+        hist = self.history()
+        data = np.concatenate([hist, values])
+
+        ref = data.mean(axis=0)
+        c = data - ref
+        zero = np.zeros((1, data.shape[1]))
+        s1 = np.concatenate([zero, np.cumsum(c, axis=0)])
+        s2 = np.concatenate([zero, np.cumsum(c * c, axis=0)])
+
+        end = np.arange(len(hist) + 1, len(data) + 1)
+        start = np.maximum(end - size, 0)
+        count = (end - start)[:, None]
+
+        sum1 = s1[end] - s1[start]
+        sum2 = s2[end] - s2[start]
+        mean_c = sum1 / count
+        m2 = np.maximum(sum2 - sum1 * mean_c, 0.0)
+        stds = np.where(count > 1, np.sqrt(m2 / np.maximum(count - 1, 1)), 0.0)
+
+        # state baru = `size` reading terakhir, dihitung ulang persis
+        tail = data[-size:]
+        self.buf[:len(tail)] = tail
+        self.n = len(tail)
+        self.pos = len(tail) % size
+        self.mean = tail.mean(axis=0)
+        self.m2 = ((tail - self.mean) ** 2).sum(axis=0)
+        self.since_resync = 0
+
+        return mean_c + ref, stds
+
+    def stats(self):
+        if self.n < 2:
+            return self.mean.copy(), np.zeros_like(self.mean)
+        # ddof=1, sama dengan default pandas .rolling().std()
+        return self.mean.copy(), np.sqrt(np.maximum(self.m2, 0.0) / (self.n - 1))
+
+
+class RollingWindowStore:
+    def __init__(self, window_size: int, n_cols: int, max_machines: int = 10000, idle_ttl: float = 3600.0):
+        self.window_size = max(1, int(window_size))
+        self.n_cols = n_cols
+        self.max_machines = max_machines
+        self.idle_ttl = idle_ttl
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def _evict(self, now: float):
+        while self._windows:
+            machine_id, w = next(iter(self._windows.items()))
+            if len(self._windows) > self.max_machines or now - w.last_seen > self.idle_ttl:
+                del self._windows[machine_id]
+            else:
+                break
+
+    def update(self, machine_id, values: np.ndarray, key=None, now: float = None):
+        """
+        Masukkan satu reading (urutan kolom INPUT_COLUMNS) lalu kembalikan
+        (mean, std) window termasuk reading tersebut. Reading dengan `key`
+        yang sama dengan sebelumnya (mis. created_at) tidak dihitung dua kali.
+        """
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            w = self._windows.get(machine_id)
+            if w is None:
+                w = _Window(self.window_size, self.n_cols)
+                self._windows[machine_id] = w
+            else:
+                self._windows.move_to_end(machine_id)
+
+            if key is None or key != w.last_key:
+                w.push(values)
+                w.last_key = key
+
+            w.last_seen = now
+            self._evict(now)
+            return w.stats()
+
+    def update_many(self, machine_ids: list, values: np.ndarray, keys: list = None):
+        """
+        Versi batch. Baris tanpa machine_id memakai window 1-step
+        (mean = nilai sekarang, std = 0) seperti sebelumnya.
+        """
+        means = values.copy()
+        stds = np.zeros_like(values)
+        now = time.monotonic()
+
+        for i, machine_id in enumerate(machine_ids):
+            if machine_id is None:
+                continue
+            key = keys[i] if keys is not None else None
+            means[i], stds[i] = self.update(machine_id, values[i], key=key, now=now)
+
+        return means, stds
+
+    def update_ordered(self, machine_ids: np.ndarray, values: np.ndarray, block: int = 4096):
+        """
+        Untuk data historis yang sudah terurut waktu (bulk scoring): semua
+        baris dianggap reading baru, dihitung per mesin secara vektor.
+        Hasil sama dengan update() berulang (selisih hanya pembulatan float).
+        """
+        machine_ids = np.asarray(machine_ids)
+        means = np.empty_like(values)
+        stds = np.empty_like(values)
+        now = time.monotonic()
+
+        order = np.argsort(machine_ids, kind="stable")
+        ids, first = np.unique(machine_ids[order], return_index=True)
+
+        with self._lock:
+            for machine_id, idx in zip(ids.tolist(), np.split(order, first[1:])):
+                w = self._windows.get(machine_id)
+                if w is None:
+                    w = _Window(self.window_size, self.n_cols)
+                    self._windows[machine_id] = w
+                else:
+                    self._windows.move_to_end(machine_id)
+
+                # blok dibatasi supaya sum kumulatif tidak kehilangan presisi
+                for i in range(0, len(idx), block):
+                    part = idx[i:i + block]
+                    means[part], stds[part] = w.push_block(values[part])
+
+                w.last_key = None
+                w.last_seen = now
+            self._evict(now)
+
+        return means, stds
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
@@ -0,0 +1,361 @@
+# ============================================================
+#  BULK SCORING OFFLINE (backfill prediction_logs / anomaly_logs)
+#  CSV/Parquet dibaca per chunk -> feature pipeline yang sama
+#  dengan server -> model failure + anomaly -> ditulis per chunk
+#  ke Parquet/CSV dengan kolom siap `COPY`. Memori tetap
+#  ~ chunk_size x chunk in-flight, berapa pun ukuran input.
+#
+#  Rolling window (fitur anomaly) dihitung per machine_id sesuai
+#  urutan baris, jadi input harus terurut waktu per mesin
+#  (mis. export sensor_logs ... ORDER BY created_at).
+#
+#  Contoh:
+#    python score_bulk.py ../backend/dataset/predictive_maintenance.csv -o out/
+#    python score_bulk.py sensor_logs.parquet -o out/ --type M --workers 4
+#    python score_bulk.py sensor_logs.csv -o out/ --format csv --no-raw
+#
+#  Perintah \copy untuk psql dicetak di akhir run.
+# ============================================================
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from features import ANOMALY_FEATURES, INPUT_COLUMNS, ROLLING_OFFSET, build_features, encode_types
+from inference import anomaly_arrays, failure_arrays, get_status
+from registry import ModelBundle
+from rolling import RollingWindowStore
+from workers import make_executor, worker_bundle
+
+# nama kolom yang dikenali: skema API, dataset Kaggle, tabel sensor_logs
+COLUMN_ALIASES = {
+    "Type": ("Type", "type"),
+    "air_temp": ("air_temp", "Air temperature [K]", "air_temperature"),
+    "process_temp": ("process_temp", "Process temperature [K]", "process_temperature"),
+    "rpm": ("rpm", "Rotational speed [rpm]", "rotational_speed"),
+    "torque": ("torque", "Torque [Nm]"),
+    "tool_wear": ("tool_wear", "Tool wear [min]"),
+    "machine_id": ("machine_id",),
+    "created_at": ("created_at", "timestamp"),
+}
+
+
+# ============================================================
+#  INPUT
+# ============================================================
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def input_columns(path: str) -> list:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def resolve_columns(available: list, default_type: str = None) -> dict:
+    """Nama kanonik -> nama kolom di file input."""
+    cols = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in available:
+                cols[name] = alias
+                break
+
+    missing = [c for c in INPUT_COLUMNS if c not in cols]
+    if "Type" not in cols and default_type is None:
+        missing.insert(0, "Type (or pass --type)")
+    if missing:
+        raise ValueError(f"Input is missing columns: {missing}")
+    return cols
+
+
+def read_chunks(path: str, chunk_size: int, columns: list):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+# ============================================================
+#  FEATURES (di proses utama: rolling state harus berurutan)
+# ============================================================
+
+def prepare_chunk(b: ModelBundle, df: pd.DataFrame, cols: dict, args, store: RollingWindowStore):
+    values = df[[cols[c] for c in INPUT_COLUMNS]].to_numpy(np.float64)
+    types = df[cols["Type"]].astype(str).to_numpy() if "Type" in cols else np.full(len(df), args.type)
+
+    # baris dengan sensor kosong atau Type yang tidak dikenal encoder tidak bisa di-score
+    allowed = [t for t in b.type_codes if store is None or t in b.anomaly_type_codes]
+    valid = ~np.isnan(values).any(axis=1) & np.isin(types, allowed)
+    if not valid.all():
+        df, values, types = df[valid], values[valid], types[valid]
+
+    n = len(df)
+    types = types.tolist()
+
+    if "machine_id" in cols:
+        machine_ids = pd.to_numeric(df[cols["machine_id"]], errors="coerce").fillna(args.machine_id)
+        machine_ids = machine_ids.to_numpy(np.int64)
+    else:
+        machine_ids = np.full(n, args.machine_id, dtype=np.int64)
+
+    meta = {
+        "types": types,
+        "values": values,
+        "machine_ids": machine_ids,
+        "created_at": df[cols["created_at"]].to_numpy() if "created_at" in cols else None,
+        "skipped": int((~valid).sum()),
+    }
+
+    X_fail = build_features(encode_types(types, b.type_codes), values)
+
+    X_anom = None
+    if store is not None:
+        X_anom = build_features(encode_types(types, b.anomaly_type_codes), values, width=len(ANOMALY_FEATURES))
+        means, stds = store.update_ordered(machine_ids, values)
+        X_anom[:, ROLLING_OFFSET::2] = means
+        X_anom[:, ROLLING_OFFSET + 1::2] = stds
+
+    return meta, X_fail, X_anom
+
+
+# ============================================================
+#  SCORING (inline atau di worker process)
+# ============================================================
+
+def score_chunk(b: ModelBundle, X_fail: np.ndarray, X_anom: np.ndarray):
+    failure = failure_arrays(b, X_fail)
+    anomaly = anomaly_arrays(b, X_anom) if X_anom is not None else None
+    return failure, anomaly
+
+
+def _score_in_worker(X_fail: np.ndarray, X_anom: np.ndarray):
+    return score_chunk(worker_bundle(), X_fail, X_anom)
+
+
+# ============================================================
+#  OUTPUT (kolom = kolom tabel, urutan = urutan COPY)
+# ============================================================
+
+def backend_status(labels: np.ndarray, confidence: np.ndarray) -> np.ndarray:
+    # sama dengan mapStatus() di backend/src/services/prediction/predictionService.js
+    status = np.where(confidence >= 0.80, "CRITICAL", np.where(confidence >= 0.40, "WARNING", "NORMAL"))
+    status[labels == "No Failure"] = "NORMAL"
+    return status
+
+
+def prediction_frame(meta: dict, failure, with_raw: bool) -> pd.DataFrame:
+    labels, confidence, probabilities, prob_labels = failure
+    if confidence is None:
+        confidence = np.zeros(len(labels))
+
+    df = pd.DataFrame({
+        "machine_id": meta["machine_ids"],
+        "failure_type": labels,
+        "failure_probability": confidence,
+        "status": backend_status(labels, confidence),
+    })
+
+    if with_raw:
+        # raw = bentuk respons /predict (tanpa input_features)
+        probs = probabilities.tolist() if probabilities is not None else None
+        df["raw"] = [
+            json.dumps({
+                "predicted_failure": label,
+                "confidence": conf,
+                "probabilities": dict(zip(prob_labels, probs[i])) if probs is not None else None,
+                "status": get_status(label),
+            })
+            for i, (label, conf) in enumerate(zip(labels.tolist(), confidence.tolist()))
+        ]
+
+    if meta["created_at"] is not None:
+        df["created_at"] = meta["created_at"]
+    return df
+
+
+def anomaly_frame(meta: dict, anomaly, with_raw: bool) -> pd.DataFrame:
+    is_anomaly, scores = anomaly
+    values = meta["values"]
+    status = np.where(is_anomaly, "WARNING", "NORMAL")
+
+    df = pd.DataFrame({
+        "machine_id": meta["machine_ids"],
+        "type": meta["types"],
+        "air_temp": values[:, 0],
+        "process_temp": values[:, 1],
+        "rpm": values[:, 2],
+        "torque": values[:, 3],
+        "tool_wear": values[:, 4],
+        "is_anomaly": is_anomaly,
+        "score": scores if scores is not None else np.nan,
+        "status": status,
+    })
+
+    if with_raw:
+        # raw = bentuk respons /anomaly (tanpa input_features & metadata)
+        score_list = scores.tolist() if scores is not None else [None] * len(is_anomaly)
+        df["raw"] = [
+            json.dumps({"is_anomaly": flag, "score": score, "status": s})
+            for flag, score, s in zip(is_anomaly.tolist(), score_list, status.tolist())
+        ]
+
+    if meta["created_at"] is not None:
+        df["created_at"] = meta["created_at"]
+    return df
+
+
+class ChunkWriter:
+    """Tulis DataFrame per chunk ke satu file Parquet/CSV (append)."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self.columns = None
+        self.rows = 0
+        self._writer = None
+        self._file = None
+
+    def write(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            if self._file is None:
+                self._file = open(self.path, "w", newline="")
+                df.to_csv(self._file, index=False)
+            else:
+                df.to_csv(self._file, index=False, header=False)
+
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def copy_command(self, table: str) -> str:
+        if self.fmt == "parquet" or self.columns is None:
+            return f"-- {table}: load {self.path} (Parquet) with your loader of choice"
+        return f"\\copy {table} ({','.join(self.columns)}) FROM '{self.path}' WITH (FORMAT csv, HEADER true)"
+
+
+# ============================================================
+#  MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet sensor history offline in fixed-size chunks")
+    parser.add_argument("input", help="CSV or Parquet file (dataset or sensor_logs export)")
+    parser.add_argument("-o", "--output-dir", default="bulk_scores")
+    parser.add_argument("--format", choices=("parquet", "csv"), default="parquet")
+    parser.add_argument("--model-dir", default=os.getenv("MODEL_DIR", os.getenv("MODEL_ROOT", "./models")))
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per chunk")
+    parser.add_argument("--workers", type=int, default=0, help="scoring processes (0 = in-process, -1 = all cores)")
+    parser.add_argument("--type", help="machine Type (L/M/H) when the input has no Type column")
+    parser.add_argument("--machine-id", type=int, default=1, help="machine_id when the input has none")
+    parser.add_argument("--skip-anomaly", action="store_true", help="only write prediction_logs")
+    parser.add_argument("--no-raw", action="store_true", help="leave the raw JSONB column out")
+    args = parser.parse_args()
+
+    with_raw = not args.no_raw
+    workers = args.workers if args.workers >= 0 else (os.cpu_count() or 1)
+
+    try:
+        cols = resolve_columns(input_columns(args.input), args.type)
+    except ValueError as e:
+        parser.error(str(e))
+
+    b = ModelBundle(args.model_dir)
+    score_anomaly = not args.skip_anomaly
+    if score_anomaly and b.anomaly_model is None:
+        parser.error(f"Anomaly model not loaded ({b.anomaly_error}); use --skip-anomaly")
+
+    store = None
+    if score_anomaly:
+        # offline: tidak ada eviction karena idle / jumlah mesin
+        store = RollingWindowStore(b.window_size, len(INPUT_COLUMNS), max_machines=sys.maxsize, idle_ttl=float("inf"))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    ext = "parquet" if args.format == "parquet" else "csv"
+    pred_out = ChunkWriter(os.path.join(args.output_dir, f"prediction_logs.{ext}"), args.format)
+    anom_out = ChunkWriter(os.path.join(args.output_dir, f"anomaly_logs.{ext}"), args.format) if score_anomaly else None
+
+    executor = make_executor(b, workers) if workers else None
+    max_in_flight = 2 * workers
+    pending = deque()
+
+    total = skipped = 0
+    start = time.perf_counter()
+
+    def write(meta, scored):
+        nonlocal total, skipped
+        failure, anomaly = scored
+        pred_out.write(prediction_frame(meta, failure, with_raw))
+        if anom_out is not None:
+            anom_out.write(anomaly_frame(meta, anomaly, with_raw))
+
+        total += len(meta["machine_ids"])
+        skipped += meta["skipped"]
+        elapsed = time.perf_counter() - start
+        print(f"{total} rows scored ({total / elapsed:.0f} rows/s)", file=sys.stderr, flush=True)
+
+    try:
+        for df in read_chunks(args.input, args.chunk_size, list(cols.values())):
+            meta, X_fail, X_anom = prepare_chunk(b, df, cols, args, store)
+            if not len(X_fail):
+                skipped += meta["skipped"]
+                continue
+
+            if executor is None:
+                write(meta, score_chunk(b, X_fail, X_anom))
+                continue
+
+            # urutan output = urutan input; chunk in-flight dibatasi supaya memori tetap datar
+            pending.append((meta, executor.submit(_score_in_worker, X_fail, X_anom)))
+            if len(pending) >= max_in_flight:
+                meta, job = pending.popleft()
+                write(meta, job.result())
+
+        while pending:
+            meta, job = pending.popleft()
+            write(meta, job.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        pred_out.close()
+        if anom_out is not None:
+            anom_out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{total} rows in {elapsed:.1f}s, {skipped} skipped (missing sensor values or unknown Type)")
+    print(f"model: {b.model_dir}")
+    print(pred_out.copy_command("prediction_logs"))
+    if anom_out is not None:
+        print(anom_out.copy_command("anomaly_logs"))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,42 +3,115 @@
 #  FastAPI with all endpoints needed for AI Agent & n8n Tools
 # ============================================================
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import joblib
+import asyncio
+import hmac
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
 import numpy as np
-import pandas as pd
-import requests
 
-app = FastAPI(title="Predictive Maintenance ML Service")
+from features import (
+    FEATURE_ORDER, ANOMALY_FEATURES, ROLLING_OFFSET, build_features, encode_types,
+    INPUT_COLUMNS, features_to_records, rows_to_arrays,
+)
+from rolling import RollingWindowStore
+from backend_client import BackendClient
+from cache import PredictionCache
+from registry import ModelBundle, ModelRegistry
+from inference import anomaly_matrix, get_status, predict_matrix
+from workers import InferencePool, PoolBroken, PoolOverloaded, PoolTimeout
+import metrics
+from metrics import MetricsMiddleware, profiler, timed
 
 # ============================================================
 #  CONFIG: BACKEND (untuk ambil sensor data)
 # ============================================================
 
-BACKEND_URL = "http://localhost:5000"      # <- ubah jika perlu
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:5000")      # <- ubah jika perlu
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", 5.0))            # detik
+BACKEND_MAX_CONNECTIONS = int(os.getenv("BACKEND_MAX_CONNECTIONS", 20))
+BACKEND_MAX_CONCURRENCY = int(os.getenv("BACKEND_MAX_CONCURRENCY", 20))
+LATEST_CACHE_TTL = float(os.getenv("LATEST_CACHE_TTL", 1.0))          # detik
+
+backend = BackendClient(
+    BACKEND_URL,
+    timeout=BACKEND_TIMEOUT,
+    max_connections=BACKEND_MAX_CONNECTIONS,
+    max_concurrency=BACKEND_MAX_CONCURRENCY,
+    latest_ttl=LATEST_CACHE_TTL,
+)
+
+
+# ============================================================
+#  CONFIG: INFERENCE WORKER POOL (0 = inferensi di thread proses ini)
+# ============================================================
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 0))          # -1 = semua core
+INFERENCE_MAX_QUEUE_ROWS = int(os.getenv("INFERENCE_MAX_QUEUE_ROWS", 20000))
+INFERENCE_BATCH_ROWS = int(os.getenv("INFERENCE_BATCH_ROWS", 512))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 2.0))
+INFERENCE_START_METHOD = os.getenv("INFERENCE_START_METHOD") or None  # default forkserver / spawn
+INFERENCE_TIMEOUT_S = float(os.getenv("INFERENCE_TIMEOUT_S", 30))
+
+inference_pool = InferencePool(
+    INFERENCE_WORKERS if INFERENCE_WORKERS >= 0 else (os.cpu_count() or 1),
+    max_queue_rows=INFERENCE_MAX_QUEUE_ROWS,
+    batch_rows=INFERENCE_BATCH_ROWS,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+    start_method=INFERENCE_START_METHOD,
+    timeout_s=INFERENCE_TIMEOUT_S,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await backend.start()
+    if INFERENCE_WORKERS:
+        # load model sekarang; worker memakai direktori versi yang sama
+        b = await run_in_threadpool(registry.get)
+        await inference_pool.start(b)
+    yield
+    await inference_pool.close()
+    await backend.close()
+
+
+class TimedJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with timed("serialize", "response"):
+            return super().render(content)
+
+
+app = FastAPI(
+    title="Predictive Maintenance ML Service",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
+)
+app.add_middleware(MetricsMiddleware)
 
 
 # ============================================================
-#  LOAD MODEL PREDIKSI FAILURE (XGBoost + scaler + encoders)
+#  MODEL REGISTRY (XGBoost + scaler + encoders + anomaly)
+#  Di-load saat request pertama; versi lain = sub-direktori MODEL_ROOT
 # ============================================================
 
-MODEL_PATH = "./models/model.pkl"
-SCALER_PATH = "./models/scaler.pkl"
-FAILURE_LE_PATH = "./models/failure_le.pkl"
-TYPE_LE_PATH = "./models/type_le.pkl"
+MODEL_ROOT = os.getenv("MODEL_ROOT", "./models")
+MODEL_DIR = os.getenv("MODEL_DIR", MODEL_ROOT)
+ML_ADMIN_KEY = os.getenv("ML_ADMIN_KEY")        # kosong = endpoint admin nonaktif
+
+registry = ModelRegistry(MODEL_DIR, root=MODEL_ROOT)
 
-model = joblib.load(MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
-failure_le = joblib.load(FAILURE_LE_PATH)
-type_le = joblib.load(TYPE_LE_PATH)
+# cache hasil prediksi; PREDICT_CACHE_SIZE=0 untuk menonaktifkan
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", 4096))
+PREDICT_CACHE_DECIMALS = int(os.getenv("PREDICT_CACHE_DECIMALS", 2))
 
-FEATURE_ORDER = [
-    "Type", "air_temp", "process_temp", "rpm", "torque", "tool_wear",
-    "temp_diff", "torque_rpm_ratio", "power", "temp_stress",
-    "wear_per_rpm", "torque_squared", "tool_wear_squared",
-    "torque_wear_interaction", "rpm_temp_interaction", "power_wear_ratio",
-]
+predict_cache = PredictionCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_DECIMALS)
 
 
 # ============================================================
@@ -55,41 +128,127 @@ class PredictRequest(BaseModel):
 
 
 # ============================================================
-#  FEATURE ENGINEERING PREDICTION
+#  BATCH INFERENCE (cache -> 1x scaler.transform + 1x predict_proba)
+#  Pipeline dipecah: prepare (fitur + cache) -> model -> finish.
+#  Tanpa worker pool semuanya jalan di satu thread threadpool; dengan
+#  pool, langkah model di-await dari event loop sehingga request yang
+#  antre tidak memegang thread dan antrian dibatasi oleh pool
+#  (INFERENCE_MAX_QUEUE_ROWS -> 503).
 # ============================================================
 
-def make_features_from_input(d: dict) -> pd.DataFrame:
-    df = pd.DataFrame([d])
+def use_pool(b: ModelBundle) -> bool:
+    # bundle lama (request yang mulai sebelum reload) tetap dihitung lokal
+    # pool yang sedang dibangun ulang setelah worker crash juga dilewati
+    return inference_pool.available and b is inference_pool.bundle
+
+
+async def pool_run(kind: str, X: np.ndarray) -> list:
+    with timed("pool", kind):
+        return await inference_pool.run(kind, X)
+
+
+async def current_bundle() -> ModelBundle:
+    # load pertama (lazy) jangan sampai memblokir event loop
+    return registry.get() if registry.loaded else await run_in_threadpool(registry.get)
+
+
+def _http_error(e: Exception) -> HTTPException:
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, (PoolOverloaded, PoolBroken)):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if isinstance(e, PoolTimeout):
+        return HTTPException(status_code=504, detail=str(e))
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def _take(X: np.ndarray, idx: list) -> np.ndarray:
+    return X if len(idx) == len(X) else X[idx]
+
+
+def cache_lookup(b: ModelBundle, types: list, values: np.ndarray):
+    """(keys, results, miss): results berisi hit dari cache, None untuk baris yang harus ke model."""
+    if not predict_cache.enabled:
+        return None, [None] * len(types), list(range(len(types)))
+
+    # bundle baru (hot reload) -> cache otomatis dikosongkan
+    predict_cache.bind(b.generation)
+    keys = predict_cache.keys_for(types, values)
+    results = [predict_cache.get(k, b.generation) for k in keys]
+    return keys, results, [i for i, r in enumerate(results) if r is None]
+
+
+def cache_fill(b: ModelBundle, keys: list, results: list, miss: list, computed: list) -> list:
+    for i, result in zip(miss, computed):
+        results[i] = result
+        if keys is not None:
+            predict_cache.put(keys[i], result, b.generation)
 
-    if df.loc[0, "Type"] not in list(type_le.classes_):
-        raise ValueError(f"Unknown Type '{df.loc[0, 'Type']}', allowed: {list(type_le.classes_)}")
+    # hasil dari cache di-copy supaya input_features tidak menempel di entry cache
+    return results if keys is None else [dict(r) for r in results]
 
-    df["Type"] = type_le.transform(df["Type"])
 
-    df["temp_diff"] = df["process_temp"] - df["air_temp"]
-    df["torque_rpm_ratio"] = df["torque"] / (df["rpm"] + 1e-5)
-    df["power"] = df["torque"] * df["rpm"] / 9.5488
-    df["temp_stress"] = df["process_temp"] / (df["air_temp"] + 1e-5)
-    df["wear_per_rpm"] = df["tool_wear"] / (df["rpm"] + 1e-5)
-    df["torque_squared"] = df["torque"] ** 2
-    df["tool_wear_squared"] = df["tool_wear"] ** 2
-    df["torque_wear_interaction"] = df["torque"] * df["tool_wear"]
-    df["rpm_temp_interaction"] = df["rpm"] * df["temp_diff"]
-    df["power_wear_ratio"] = df["power"] / (df["tool_wear"] + 1e-5)
+def split_known_types(rows: list, *type_codes: dict):
+    """
+    Pisahkan baris yang Type-nya dikenal semua encoder dari yang tidak:
+    (index baris valid, error per baris). Satu Type salah tidak boleh
+    menggagalkan satu batch penuh.
+    """
+    allowed = [t for t in type_codes[0] if all(t in codes for codes in type_codes)]
+    valid, errors = [], []
+    for i, r in enumerate(rows):
+        if r["Type"] in allowed:
+            valid.append(i)
+        else:
+            errors.append({
+                "index": i,
+                "machine_id": r.get("machine_id"),
+                "error": f"Unknown Type '{r['Type']}', allowed: {allowed}",
+            })
+    return valid, errors
 
-    missing = [c for c in FEATURE_ORDER if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing columns: {missing}")
 
-    return df[FEATURE_ORDER]
+def batch_response(n: int, valid: list, results: list, errors: list) -> dict:
+    # results sejajar dengan input; baris yang gagal = null + entri di "errors"
+    out = [None] * n
+    for i, r in zip(valid, results):
+        out[i] = r
 
+    response = {"count": n, "results": out}
+    if errors:
+        response["errors"] = errors
+    return response
 
-def get_status(pred_failure: str, anomaly_label: int = 0):
-    if pred_failure not in ["No Failure", "NO_FAILURE"]:
-        return "CRITICAL"
-    if anomaly_label == 1:
-        return "WARNING"
-    return "NORMAL"
+
+def predict_prepare(b: ModelBundle, rows: list):
+    with timed("features", "failure"):
+        types, values = rows_to_arrays(rows)
+        X_input = build_features(encode_types(types, b.type_codes), values)
+    return (X_input, *cache_lookup(b, types, values))
+
+
+def predict_finish(b: ModelBundle, X_input: np.ndarray, keys, results, miss, computed) -> list:
+    results = cache_fill(b, keys, results, miss, computed)
+
+    for result, features in zip(results, features_to_records(X_input, FEATURE_ORDER)):
+        result["input_features"] = features
+
+    return results
+
+
+def predict_rows(b: ModelBundle, rows: list) -> list:
+    X_input, keys, results, miss = predict_prepare(b, rows)
+    computed = predict_matrix(b, _take(X_input, miss)) if miss else []
+    return predict_finish(b, X_input, keys, results, miss, computed)
+
+
+async def predict_rows_async(b: ModelBundle, rows: list) -> list:
+    if not use_pool(b):
+        return await run_in_threadpool(predict_rows, b, rows)
+
+    X_input, keys, results, miss = await run_in_threadpool(predict_prepare, b, rows)
+    computed = await pool_run("failure", _take(X_input, miss)) if miss else []
+    return await run_in_threadpool(predict_finish, b, X_input, keys, results, miss, computed)
 
 
 # ============================================================
@@ -97,39 +256,31 @@ def get_status(pred_failure: str, anomaly_label: int = 0):
 # ============================================================
 
 @app.post("/predict")
-def predict(req: PredictRequest):
+async def predict(req: PredictRequest):
     try:
-        df_input = make_features_from_input(req.dict())
-        X_scaled = scaler.transform(df_input)
-        pred_encoded = model.predict(X_scaled)[0]
-
-        probabilities = None
-        if hasattr(model, "predict_proba"):
-            probabilities = model.predict_proba(X_scaled)[0]
+        return (await predict_rows_async(await current_bundle(), [req.dict()]))[0]
+    except Exception as e:
+        raise _http_error(e)
 
-        pred_failure = failure_le.inverse_transform([pred_encoded])[0]
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+# ============================================================
+#  ENDPOINT: BATCH PREDICTION (satu request untuk seluruh mesin)
+# ============================================================
 
-    prob_dict = {}
-    if probabilities is not None:
-        for idx, prob in enumerate(probabilities):
-            try:
-                label = failure_le.inverse_transform([idx])[0]
-            except:
-                label = str(idx)
-            prob_dict[label] = float(prob)
+@app.post("/predict/batch")
+async def predict_batch(reqs: List[PredictRequest]):
+    if not reqs:
+        return {"count": 0, "results": []}
 
-    status = get_status(pred_failure)
+    try:
+        b = await current_bundle()
+        rows = [r.dict() for r in reqs]
+        valid, errors = split_known_types(rows, b.type_codes)
+        results = await predict_rows_async(b, [rows[i] for i in valid]) if valid else []
+    except Exception as e:
+        raise _http_error(e)
 
-    return {
-        "predicted_failure": pred_failure,
-        "confidence": float(probabilities[pred_encoded]) if probabilities is not None else None,
-        "probabilities": prob_dict or None,
-        "status": status,
-        "input_features": df_input.to_dict(orient="records")[0],
-    }
+    return batch_response(len(rows), valid, results, errors)
 
 
 # ============================================================
@@ -137,9 +288,9 @@ def predict(req: PredictRequest):
 # ============================================================
 
 @app.get("/predict/latest/{machine_id}")
-def predict_latest(machine_id: int):
+async def predict_latest(machine_id: int):
     try:
-        sensor = requests.get(f"{BACKEND_URL}/api/machines/latest/{machine_id}").json()
+        sensor = await backend.latest(machine_id)
 
         req = PredictRequest(
             Type=sensor["Type"],
@@ -150,41 +301,41 @@ def predict_latest(machine_id: int):
             tool_wear=sensor["tool_wear"]
         )
 
-        return predict(req)
+        return await predict(req)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sensor error: {str(e)}")
 
 
 # ============================================================
-#  LOAD ANOMALY MODEL
+#  ROLLING WINDOW PER MESIN (state di memori, bukan query history)
 # ============================================================
 
-ANOMALY_MODEL_PATH = "./models/model_anomaly/anomaly_isoforest.pkl"
-ANOMALY_SCALER_PATH = "./models/model_anomaly/anomaly_scaler.pkl"
-ANOMALY_TYPE_LE_PATH = "./models/model_anomaly/anomaly_type_le.pkl"
-ANOMALY_META_PATH = "./models/model_anomaly/model_metadata.pkl"
+ROLLING_WINDOW = int(os.getenv("ROLLING_WINDOW", 0))               # 0 = ikut window_size model
+ROLLING_MAX_MACHINES = int(os.getenv("ROLLING_MAX_MACHINES", 10000))
+ROLLING_IDLE_TTL = float(os.getenv("ROLLING_IDLE_TTL", 3600))      # detik
+
+rolling_store = None
+_rolling_lock = threading.Lock()
 
-try:
-    anomaly_model = joblib.load(ANOMALY_MODEL_PATH)
-    anomaly_scaler = joblib.load(ANOMALY_SCALER_PATH)
-    anomaly_type_le = joblib.load(ANOMALY_TYPE_LE_PATH)
-    anomaly_meta = joblib.load(ANOMALY_META_PATH)
-except:
-    anomaly_model = None
 
+def get_rolling_store(b: ModelBundle) -> RollingWindowStore:
+    """Store dibuat ulang hanya jika model baru memakai window_size berbeda."""
+    global rolling_store
+    window = ROLLING_WINDOW or b.window_size
 
-ANOMALY_FEATURES = [
-    "Type","air_temp","process_temp","rpm","torque","tool_wear",
-    "temp_diff","torque_rpm_ratio","power","temp_stress","wear_per_rpm",
-    "torque_squared","tool_wear_squared","torque_wear_interaction",
-    "rpm_temp_interaction","power_wear_ratio",
-    "air_temp_rolling_mean","air_temp_rolling_std",
-    "process_temp_rolling_mean","process_temp_rolling_std",
-    "rpm_rolling_mean","rpm_rolling_std",
-    "torque_rolling_mean","torque_rolling_std",
-    "tool_wear_rolling_mean","tool_wear_rolling_std"
-]
+    store = rolling_store
+    if store is None or store.window_size != window:
+        with _rolling_lock:
+            if rolling_store is None or rolling_store.window_size != window:
+                rolling_store = RollingWindowStore(
+                    window, len(INPUT_COLUMNS),
+                    max_machines=ROLLING_MAX_MACHINES, idle_ttl=ROLLING_IDLE_TTL,
+                )
+            store = rolling_store
+    return store
 
 
 class AnomalyRequest(BaseModel):
@@ -194,33 +345,51 @@ class AnomalyRequest(BaseModel):
     rpm: float
     torque: float
     tool_wear: float
+    machine_id: Optional[int] = None      # jika ada -> pakai rolling window mesin tsb
+    timestamp: Optional[str] = None       # created_at reading, untuk cegah hitung ganda
+
+
+def fill_rolling_features(b: ModelBundle, X: np.ndarray, rows: list, values: np.ndarray):
+    # rolling per mesin; tanpa machine_id tetap 1-step (mean = nilai, std = 0)
+    means, stds = get_rolling_store(b).update_many(
+        [r.get("machine_id") for r in rows], values, [r.get("timestamp") for r in rows]
+    )
+    X[:, ROLLING_OFFSET::2] = means
+    X[:, ROLLING_OFFSET + 1::2] = stds
 
 
-def make_features_for_anomaly(d: dict):
-    if anomaly_model is None:
+def make_features_for_anomaly_rows(b: ModelBundle, rows: list) -> np.ndarray:
+    if b.anomaly_model is None:
         raise RuntimeError("Anomaly model missing")
 
-    df = pd.DataFrame([d])
-    df["Type"] = anomaly_type_le.transform([d["Type"]])[0]
+    with timed("features", "anomaly"):
+        types, values = rows_to_arrays(rows)
+        X = build_features(encode_types(types, b.anomaly_type_codes), values, width=len(ANOMALY_FEATURES))
+
+        fill_rolling_features(b, X, rows, values)
+
+    return X
+
+
+def anomaly_finish(b: ModelBundle, X: np.ndarray, results: list) -> list:
+    for result, features in zip(results, features_to_records(X, ANOMALY_FEATURES)):
+        result["input_features"] = features
+        result["metadata"] = b.anomaly_meta
+    return results
+
 
-    # engineered features
-    df["temp_diff"] = df["process_temp"] - df["air_temp"]
-    df["torque_rpm_ratio"] = df["torque"] / (df["rpm"] + 1e-5)
-    df["power"] = df["torque"] * df["rpm"] / 9.5488
-    df["temp_stress"] = df["process_temp"] / (df["air_temp"] + 1e-5)
-    df["wear_per_rpm"] = df["tool_wear"] / (df["rpm"] + 1e-5)
-    df["torque_squared"] = df["torque"] ** 2
-    df["tool_wear_squared"] = df["tool_wear"] ** 2
-    df["torque_wear_interaction"] = df["torque"] * df["tool_wear"]
-    df["rpm_temp_interaction"] = df["rpm"] * df["temp_diff"]
-    df["power_wear_ratio"] = df["power"] / (df["tool_wear"] + 1e-5)
+def anomaly_rows(b: ModelBundle, rows: list) -> list:
+    X = make_features_for_anomaly_rows(b, rows)
+    return anomaly_finish(b, X, anomaly_matrix(b, X))
 
-    # rolling (1-step)
-    for col in ["air_temp","process_temp","rpm","torque","tool_wear"]:
-        df[f"{col}_rolling_mean"] = df[col]
-        df[f"{col}_rolling_std"] = 0.0
 
-    return df[ANOMALY_FEATURES]
+async def anomaly_rows_async(b: ModelBundle, rows: list) -> list:
+    if not use_pool(b):
+        return await run_in_threadpool(anomaly_rows, b, rows)
+
+    X = await run_in_threadpool(make_features_for_anomaly_rows, b, rows)
+    results = await pool_run("anomaly", X)
+    return await run_in_threadpool(anomaly_finish, b, X, results)
 
 
 # ============================================================
@@ -228,37 +397,34 @@ def make_features_for_anomaly(d: dict):
 # ============================================================
 
 @app.post("/anomaly")
-def anomaly(req: AnomalyRequest):
-    if anomaly_model is None:
-        raise HTTPException(status_code=500, detail="Anomaly model not loaded")
-
-    df = make_features_for_anomaly(req.dict())
-    X_scaled = anomaly_scaler.transform(df)
-
-    raw_pred = anomaly_model.predict(X_scaled)[0]
-    is_anomaly = 1 if raw_pred == -1 else 0
+async def anomaly(req: AnomalyRequest):
+    try:
+        b = await current_bundle()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    score = None
-    if hasattr(anomaly_model, "decision_function"):
-        score = float(anomaly_model.decision_function(X_scaled)[0])
+    if b.anomaly_model is None:
+        raise HTTPException(status_code=500, detail=f"Anomaly model not loaded: {b.anomaly_error}")
 
-    return {
-        "is_anomaly": bool(is_anomaly),
-        "score": score,
-        "status": "WARNING" if is_anomaly else "NORMAL",
-        "input_features": df.to_dict(orient="records")[0],
-        "metadata": anomaly_meta,
-    }
+    try:
+        return (await anomaly_rows_async(b, [req.dict()]))[0]
+    except Exception as e:
+        raise _http_error(e)
 
 
 # ============================================================
 #  ENDPOINT: ANOMALY LATEST BASED ON BACKEND SENSOR
 # ============================================================
 
+def _reading_key(sensor: dict) -> Optional[str]:
+    ts = sensor.get("created_at") or sensor.get("timestamp")
+    return str(ts) if ts is not None else None
+
+
 @app.get("/anomaly/latest/{machine_id}")
-def anomaly_latest(machine_id: int):
+async def anomaly_latest(machine_id: int):
     try:
-        sensor = requests.get(f"{BACKEND_URL}/api/machines/latest/{machine_id}").json()
+        sensor = await backend.latest(machine_id)
 
         req = AnomalyRequest(
             Type=sensor["Type"],
@@ -266,35 +432,372 @@ def anomaly_latest(machine_id: int):
             process_temp=sensor["process_temp"],
             rpm=sensor["rpm"],
             torque=sensor["torque"],
-            tool_wear=sensor["tool_wear"]
+            tool_wear=sensor["tool_wear"],
+            machine_id=machine_id,
+            timestamp=_reading_key(sensor),
         )
 
-        return anomaly(req)
+        return await anomaly(req)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sensor error: {str(e)}")
 
 
+# ============================================================
+#  ENDPOINT: ASSESS (prediction + anomaly, fitur dihitung sekali)
+# ============================================================
+
+class AssessRequest(AnomalyRequest):
+    pass
+
+
+def assess_type_codes(b: ModelBundle) -> list:
+    return [b.type_codes, b.anomaly_type_codes] if b.anomaly_model is not None else [b.type_codes]
+
+
+def assess_prepare(b: ModelBundle, rows: list):
+    with timed("features", "assess"):
+        types, values = rows_to_arrays(rows)
+        X = build_features(encode_types(types, b.type_codes), values, width=len(ANOMALY_FEATURES))
+
+    # blok FEATURE_ORDER adalah prefix dari ANOMALY_FEATURES -> view, tanpa copy
+    X_input = X[:, :ROLLING_OFFSET]
+    cached = cache_lookup(b, types, values)
+
+    if b.anomaly_model is not None:
+        if b.anomaly_type_codes != b.type_codes:
+            # kolom Type di X diganti kode encoder anomaly -> model failure pakai salinan
+            X_input = X_input.copy()
+            X[:, 0] = encode_types(types, b.anomaly_type_codes)
+
+        with timed("features", "assess"):
+            fill_rolling_features(b, X, rows, values)
+
+    return X, X_input, cached
+
+
+def assess_finish(b: ModelBundle, rows: list, X: np.ndarray, cached, computed: list, anomalies) -> list:
+    predictions = cache_fill(b, *cached, computed)
+    if anomalies is None:
+        anomalies = [None] * len(rows)
+
+    columns = ANOMALY_FEATURES if b.anomaly_model is not None else FEATURE_ORDER
+    features = features_to_records(X[:, :len(columns)], columns)
+
+    results = []
+    for i, row in enumerate(rows):
+        pred, anom = predictions[i], anomalies[i]
+        anomaly_label = 1 if anom is not None and anom["is_anomaly"] else 0
+
+        results.append({
+            "machine_id": row.get("machine_id"),
+            "status": get_status(pred["predicted_failure"], anomaly_label),
+            "prediction": pred,
+            "anomaly": anom,
+            "input_features": features[i],
+        })
+
+    return results
+
+
+def assess_rows(b: ModelBundle, rows: list) -> list:
+    X, X_input, cached = assess_prepare(b, rows)
+    miss = cached[2]
+
+    computed = predict_matrix(b, _take(X_input, miss)) if miss else []
+    anomalies = anomaly_matrix(b, X) if b.anomaly_model is not None else None
+    return assess_finish(b, rows, X, cached, computed, anomalies)
+
+
+async def assess_rows_async(b: ModelBundle, rows: list) -> list:
+    if not use_pool(b):
+        return await run_in_threadpool(assess_rows, b, rows)
+
+    X, X_input, cached = await run_in_threadpool(assess_prepare, b, rows)
+    miss = cached[2]
+
+    # failure & anomaly dikirim ke pool bersamaan
+    jobs = {}
+    if miss:
+        jobs["failure"] = pool_run("failure", _take(X_input, miss))
+    if b.anomaly_model is not None:
+        jobs["anomaly"] = pool_run("anomaly", X)
+    done = dict(zip(jobs, await asyncio.gather(*jobs.values())))
+
+    return await run_in_threadpool(
+        assess_finish, b, rows, X, cached, done.get("failure", []), done.get("anomaly"),
+    )
+
+
+@app.post("/assess")
+async def assess(req: AssessRequest):
+    try:
+        return (await assess_rows_async(await current_bundle(), [req.dict()]))[0]
+    except Exception as e:
+        raise _http_error(e)
+
+
+@app.post("/assess/batch")
+async def assess_batch(reqs: List[AssessRequest]):
+    if not reqs:
+        return {"count": 0, "results": []}
+
+    try:
+        b = await current_bundle()
+        rows = [r.dict() for r in reqs]
+        valid, errors = split_known_types(rows, *assess_type_codes(b))
+        results = await assess_rows_async(b, [rows[i] for i in valid]) if valid else []
+    except Exception as e:
+        raise _http_error(e)
+
+    return batch_response(len(rows), valid, results, errors)
+
+
+# ============================================================
+#  ENDPOINT: STREAMING (WebSocket /ws/stream)
+#  Client kirim reading (object atau list) lewat satu koneksi;
+#  reading dikumpulkan jadi micro-batch -> satu assess_rows ->
+#  hasil ringkas dikirim balik. Queue dibatasi = backpressure.
+# ============================================================
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 256))
+STREAM_MAX_WAIT_MS = float(os.getenv("STREAM_MAX_WAIT_MS", 20))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 2048))
+
+
+def compact_result(row: dict, r: dict) -> dict:
+    pred, anom = r["prediction"], r["anomaly"]
+    return {
+        "machine_id": row.get("machine_id"),
+        "timestamp": row.get("timestamp"),
+        "status": r["status"],
+        "predicted_failure": pred["predicted_failure"],
+        "confidence": pred["confidence"],
+        "is_anomaly": anom["is_anomaly"] if anom is not None else None,
+        "score": anom["score"] if anom is not None else None,
+    }
+
+
+async def _score_stream_batch(rows: list) -> dict:
+    b = await current_bundle()
+
+    idx, errors = split_known_types(rows, *assess_type_codes(b))
+    valid = [rows[i] for i in idx]
+    # index = posisi di micro-batch server, tidak berarti bagi client -> pakai timestamp seperti compact_result
+    errors = [
+        {"machine_id": e["machine_id"], "timestamp": rows[e["index"]].get("timestamp"), "error": e["error"]}
+        for e in errors
+    ]
+
+    results = [compact_result(row, r) for row, r in zip(valid, await assess_rows_async(b, valid))] if valid else []
+
+    out = {"results": results}
+    if errors:
+        out["errors"] = errors
+    return out
+
+
+async def _stream_scorer(send, queue: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+
+    while True:
+        rows = [await queue.get()]
+        deadline = loop.time() + STREAM_MAX_WAIT_MS / 1000
+
+        while len(rows) < STREAM_BATCH_SIZE:
+            if not queue.empty():
+                rows.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            out = await _score_stream_batch(rows)
+        except Exception as e:
+            out = {"error": str(e), "count": len(rows)}
+        await send(out)
+
+
+@app.websocket("/ws/stream")
+async def stream(websocket: WebSocket):
+    await websocket.accept()
+
+    send_lock = asyncio.Lock()
+
+    async def send(payload: dict):
+        async with send_lock:
+            await websocket.send_json(payload)
+
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    scorer = asyncio.create_task(_stream_scorer(send, queue))
+
+    try:
+        while True:
+            try:
+                msg = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError as e:
+                await send({"error": f"Invalid JSON: {e}"})
+                continue
+
+            for reading in (msg if isinstance(msg, list) else [msg]):
+                try:
+                    row = AssessRequest(**reading).dict()
+                except (TypeError, ValidationError) as e:
+                    await send({"error": str(e), "reading": reading})
+                    continue
+
+                # queue penuh -> berhenti membaca socket sampai scorer mengejar
+                await queue.put(row)
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        scorer.cancel()
+
+
 # ============================================================
 #  ENDPOINT TREND (ambil dari backend)
 # ============================================================
 
 @app.get("/trend/{machine_id}")
-def trend(machine_id: int):
+async def trend(machine_id: int):
     try:
-        url = f"{BACKEND_URL}/api/machines/trend/{machine_id}"
-        return requests.get(url).json()
+        return await backend.trend(machine_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================
+#  ADMIN: INFO & HOT RELOAD MODEL (header x-api-key = ML_ADMIN_KEY)
+# ============================================================
+
+class ReloadRequest(BaseModel):
+    version: Optional[str] = None       # sub-direktori MODEL_ROOT; kosong = reload direktori aktif
+
+
+def verify_admin_key(x_api_key: Optional[str] = Header(None)):
+    if not ML_ADMIN_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints disabled (ML_ADMIN_KEY not set)")
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="Missing x-api-key header")
+    if not hmac.compare_digest(x_api_key, ML_ADMIN_KEY):
+        raise HTTPException(status_code=403, detail="Invalid admin API key")
+
+
+@app.get("/admin/models", dependencies=[Depends(verify_admin_key)])
+def models_info():
+    return {
+        "loaded": registry.loaded,
+        "model_root": os.path.abspath(registry.root),
+        "model": registry.get().info() if registry.loaded else None,
+    }
+
+
+@app.post("/admin/models/reload", dependencies=[Depends(verify_admin_key)])
+def models_reload(req: Optional[ReloadRequest] = None):
+    version = req.version if req is not None else None
+
+    try:
+        b = registry.reload(version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous models kept: {e}")
+
+    if inference_pool.enabled:
+        try:
+            inference_pool.restart(b)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Models reloaded but worker pool restart failed: {e}")
+
+    return {"status": "reloaded", "model": b.info()}
+
+
+# ============================================================
+#  METRICS (Prometheus) & PROFILER
+# ============================================================
+
+@metrics.collector
+def _service_metrics():
+    cache = predict_cache.stats()
+    pool = inference_pool.stats()
+    b = registry.get() if registry.loaded else None
+    return [
+        ("ml_predict_cache_events_total", "counter", "Prediction cache lookups and evictions", {
+            '{event="hit"}': cache["hits"],
+            '{event="miss"}': cache["misses"],
+            '{event="eviction"}': cache["evictions"],
+        }),
+        ("ml_predict_cache_size", "gauge", "Entries in the prediction cache", {"": cache["size"]}),
+        ("ml_rolling_machines", "gauge", "Machines with a rolling window in memory", {
+            "": len(rolling_store) if rolling_store is not None else 0,
+        }),
+        ("ml_models_loaded", "gauge", "1 if the model bundle is loaded", {
+            '{model="failure"}': int(b is not None),
+            '{model="anomaly"}': int(b is not None and b.anomaly_model is not None),
+        }),
+        ("ml_inference_workers", "gauge", "Inference worker processes", {"": pool["workers"]}),
+        ("ml_inference_queue_rows", "gauge", "Rows queued or running in the worker pool", {"": pool["queued_rows"]}),
+        ("ml_inference_shed_total", "counter", "Requests rejected because the pool queue was full", {"": pool["shed"]}),
+        ("ml_inference_pool_broken", "gauge", "1 while the worker pool is being rebuilt after a crash", {"": int(pool["broken"])}),
+        ("ml_inference_pool_restarts_total", "counter", "Worker pool rebuilds after a worker crash", {"": pool["restarts"]}),
+    ]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+class ProfilerRequest(BaseModel):
+    interval_ms: float = 5.0
+    max_seconds: float = 60.0
+
+
+@app.post("/admin/profiler/start", dependencies=[Depends(verify_admin_key)])
+def profiler_start(req: Optional[ProfilerRequest] = None):
+    req = req or ProfilerRequest()
+    started = profiler.start(interval=max(req.interval_ms, 1.0) / 1000, max_seconds=req.max_seconds)
+    return {"started": started, **profiler.report(limit=0)}
+
+
+@app.post("/admin/profiler/stop", dependencies=[Depends(verify_admin_key)])
+def profiler_stop():
+    profiler.stop()
+    return profiler.report()
+
+
+@app.get("/admin/profiler", dependencies=[Depends(verify_admin_key)])
+def profiler_report(format: str = "json", limit: int = 50):
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return profiler.report(limit=limit)
+
+
 # ============================================================
 #  HEALTH CHECK
 # ============================================================
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "ml-service"}
+    pool = inference_pool.stats()
+    return {
+        "status": "degraded" if pool["broken"] else "ok",
+        "service": "ml-service",
+        "models_loaded": registry.loaded,
+        "model_version": registry.get().version if registry.loaded else None,
+        "rolling_window": rolling_store.window_size if rolling_store is not None else ROLLING_WINDOW or None,
+        "rolling_machines": len(rolling_store) if rolling_store is not None else 0,
+        "predict_cache": predict_cache.stats(),
+        "inference_pool": pool,
+    }
 
 
 # ============================================================
@@ -0,0 +1,303 @@
+# ============================================================
+#  INFERENCE WORKER POOL (multi-process)
+#  Model XGBoost / IsolationForest berjalan di N proses sehingga
+#  tidak berebut GIL. Handler async meng-await run(); request
+#  dikumpulkan jadi micro-batch per jenis model di event loop,
+#  lalu satu batch = satu job ke worker.
+#
+#  Start method default "forkserver": server sudah multi-thread,
+#  fork langsung dari proses ini bisa mewarisi lock yang sedang
+#  dipegang thread lain (logging, metrics) lalu worker hang.
+#  Modul berat di-preload sekali di forkserver; tiap worker load
+#  bundle sendiri dengan mmap_mode="r" -> array numpy berbagi page
+#  cache. "fork" tetap bisa dipilih (bundle diwarisi copy-on-write).
+#
+#  Worker yang mati (OOM kill, segfault) membuat executor broken:
+#  batch yang terdampak gagal (503), pool dibangun ulang sekali di
+#  background dan selama itu request dihitung in-process.
+# ============================================================
+
+import asyncio
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from inference import anomaly_matrix, predict_matrix
+from metrics import capture, replay
+from registry import ModelBundle
+
+logger = logging.getLogger("ml-service.workers")
+
+# bundle milik proses worker (di-set sebelum fork atau oleh _init_worker)
+_bundle = None
+
+
+class PoolOverloaded(Exception):
+    pass
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PoolBroken(Exception):
+    pass
+
+
+def _limit_threads(b: ModelBundle):
+    # N worker x n_jobs=-1 -> oversubscription; cukup 1 thread per worker
+    for est in (b.model, b.anomaly_model):
+        if est is not None and "n_jobs" in est.get_params():
+            est.set_params(n_jobs=1)
+
+
+def _init_worker(model_dir: str, mmap_mode: str):
+    global _bundle
+    if _bundle is None or _bundle.model_dir != model_dir:
+        _bundle = ModelBundle(model_dir, mmap_mode)
+    _limit_threads(_bundle)
+
+
+def _ping():
+    return True
+
+
+def _infer(kind: str, X: np.ndarray):
+    # metric stage & ukuran batch ikut dikembalikan; histogram di worker tidak pernah di-scrape
+    with capture() as samples:
+        if kind == "failure":
+            results = predict_matrix(_bundle, X)
+        else:
+            results = anomaly_matrix(_bundle, X)
+    return results, samples
+
+
+def worker_bundle() -> ModelBundle:
+    """Bundle milik proses worker ini (untuk fungsi job di luar modul ini)."""
+    return _bundle
+
+
+def default_start_method() -> str:
+    return "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+
+
+def make_executor(bundle: ModelBundle, workers: int, start_method: str = None, mmap_mode: str = "r") -> ProcessPoolExecutor:
+    global _bundle
+    # untuk fork: worker mewarisi bundle ini tanpa load ulang
+    _bundle = bundle
+
+    ctx = mp.get_context(start_method or default_start_method())
+    if ctx.get_start_method() == "forkserver":
+        # import xgboost/sklearn sekali di forkserver, bukan di tiap worker
+        ctx.set_forkserver_preload(["workers"])
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(bundle.model_dir, mmap_mode),
+    )
+
+
+class InferencePool:
+    def __init__(
+        self,
+        workers: int,
+        max_queue_rows: int = 20000,
+        batch_rows: int = 512,
+        max_wait_ms: float = 2.0,
+        start_method: str = None,
+        mmap_mode: str = "r",
+        timeout_s: float = 30.0,
+    ):
+        self.workers = workers
+        self.max_queue_rows = max_queue_rows
+        self.batch_rows = batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.start_method = start_method or default_start_method()
+        self.mmap_mode = mmap_mode
+        self.timeout = timeout_s
+
+        self.bundle = None
+        self.queued_rows = 0
+        self.shed = 0
+        self.broken = False
+        self.restarts = 0
+
+        self._executor = None
+        self._swap_lock = asyncio.Lock()
+        self._loop = None
+        self._pending = {"failure": [], "anomaly": []}
+        self._pending_rows = {"failure": 0, "anomaly": 0}
+        self._timers = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def available(self) -> bool:
+        # pool broken -> request dihitung in-process sampai rebuild selesai
+        return self.enabled and not self.broken
+
+    def _make_executor(self, bundle: ModelBundle) -> ProcessPoolExecutor:
+        return make_executor(bundle, self.workers, self.start_method, self.mmap_mode)
+
+    async def _warmup(self, executor: ProcessPoolExecutor):
+        # buat semua worker sekarang, sebelum ada inferensi
+        await asyncio.gather(*[self._loop.run_in_executor(executor, _ping) for _ in range(self.workers)])
+
+    async def start(self, bundle: ModelBundle):
+        self._loop = asyncio.get_running_loop()
+        self.bundle = bundle
+        self._executor = self._make_executor(bundle)
+        await self._warmup(self._executor)
+
+    async def close(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _swap(self, bundle: ModelBundle, expect: ProcessPoolExecutor = None) -> bool:
+        async with self._swap_lock:
+            # rebuild setelah crash tidak boleh menimpa pool dari reload yang lebih baru
+            if expect is not None and self._executor is not expect:
+                return False
+            new = self._make_executor(bundle)
+            await self._warmup(new)
+            old, self._executor, self.bundle = self._executor, new, bundle
+            self.broken = False
+        # job yang sudah jalan di pool lama tetap selesai
+        if old is not None:
+            old.shutdown(wait=False)
+        return True
+
+    def restart(self, bundle: ModelBundle):
+        """Dipanggil dari thread (endpoint reload) setelah registry swap."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._swap(bundle), self._loop).result()
+
+    def _on_broken(self, executor: ProcessPoolExecutor):
+        # banyak batch gagal bersamaan -> tetap satu rebuild
+        if self.broken or executor is not self._executor:
+            return
+        self.broken = True
+        logger.error("Inference worker died, rebuilding pool (requests run in-process meanwhile)")
+        self._loop.create_task(self._rebuild(executor))
+
+    async def _rebuild(self, executor: ProcessPoolExecutor):
+        delay = 1.0
+        while self.broken and self._executor is executor:
+            try:
+                if await self._swap(self.bundle, expect=executor):
+                    self.restarts += 1
+                    logger.info("Inference pool rebuilt (%d workers)", self.workers)
+                return
+            except Exception as e:
+                logger.error("Inference pool rebuild failed, retrying in %gs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    # --------------------------------------------------------
+    #  dispatch
+    # --------------------------------------------------------
+
+    async def run(self, kind: str, X: np.ndarray) -> list:
+        n = len(X)
+        # request yang lebih besar dari limit tetap diterima saat antrian kosong
+        if self.queued_rows and self.queued_rows + n > self.max_queue_rows:
+            self.shed += 1
+            raise PoolOverloaded(f"Inference queue full ({self.queued_rows} rows queued)")
+
+        self.queued_rows += n
+        try:
+            # matrix besar dipecah per batch_rows -> job paralel di beberapa worker
+            parts = [self._enqueue(kind, X[i:i + self.batch_rows]) for i in range(0, n, self.batch_rows)]
+            # worker yang hang tidak boleh membuat request menunggu selamanya
+            done = await asyncio.wait_for(asyncio.gather(*parts), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"Inference timed out after {self.timeout:g}s")
+        finally:
+            self.queued_rows -= n
+
+        return done[0] if len(done) == 1 else [r for part in done for r in part]
+
+    def _enqueue(self, kind: str, X: np.ndarray) -> asyncio.Future:
+        fut = self._loop.create_future()
+        self._pending[kind].append((X, fut))
+        self._pending_rows[kind] += len(X)
+
+        if self._pending_rows[kind] >= self.batch_rows:
+            self._flush(kind)
+        elif kind not in self._timers:
+            self._timers[kind] = self._loop.call_later(self.max_wait, self._flush, kind)
+        return fut
+
+    def _flush(self, kind: str):
+        timer = self._timers.pop(kind, None)
+        if timer is not None:
+            timer.cancel()
+
+        items = self._pending[kind]
+        self._pending[kind] = []
+        self._pending_rows[kind] = 0
+        if not items:
+            return
+
+        X = items[0][0] if len(items) == 1 else np.concatenate([x for x, _ in items])
+        executor = self._executor
+
+        try:
+            job = self._loop.run_in_executor(executor, _infer, kind, X)
+        except Exception as e:
+            self._fail(items, self._check_broken(executor, e))
+            return
+
+        job.add_done_callback(lambda j: self._resolve(executor, items, j))
+
+    def _check_broken(self, executor: ProcessPoolExecutor, error: BaseException) -> BaseException:
+        if not isinstance(error, BrokenProcessPool):
+            return error
+        self._on_broken(executor)
+        return PoolBroken("Inference worker crashed, pool is restarting")
+
+    @staticmethod
+    def _fail(items: list, error: BaseException):
+        for _, fut in items:
+            if not fut.done():
+                fut.set_exception(error)
+
+    def _resolve(self, executor: ProcessPoolExecutor, items: list, job):
+        if job.cancelled():
+            error = RuntimeError("Inference job cancelled")
+        else:
+            error = job.exception()
+
+        if error is not None:
+            self._fail(items, self._check_broken(executor, error))
+            return
+
+        results, samples = job.result()
+        replay(samples)
+
+        offset = 0
+        for X, fut in items:
+            n = len(X)
+            if not fut.done():
+                fut.set_result(results[offset:offset + n])
+            offset += n
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self.available else 0,
+            "start_method": self.start_method,
+            "broken": self.broken,
+            "restarts": self.restarts,
+            "queued_rows": self.queued_rows,
+            "max_queue_rows": self.max_queue_rows,
+            "shed": self.shed,
+        }